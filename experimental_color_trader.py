@@ -15,14 +15,18 @@ Strategy: Screen Color Detection Trading
 """
 
 import asyncio
-import pyautogui
+import concurrent.futures
+import mss
 import numpy as np
-from PIL import Image
 import cv2
 import time
 import os
-import json
-import requests
+import sys
+import ctypes
+import threading
+import itertools
+import aiohttp
+import orjson
 import msgpack
 from datetime import datetime
 from decimal import Decimal
@@ -36,7 +40,63 @@ from eth_account.messages import encode_typed_data
 from eth_utils.crypto import keccak
 from eth_utils.conversions import to_hex
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None  # Numba is optional; get_dominant_bin falls back to np.bincount
+
+try:
+    from xxhash import xxh3_64_intdigest as _frame_hash
+except ImportError:
+    from zlib import crc32 as _frame_hash  # xxhash is optional; CRC32 is fast enough for a frame
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None  # Optional faster event loop (not available on Windows)
+
+if njit is not None:
+    @njit(cache=True)
+    def _dominant_bin_kernel(image, hist):
+        """Quantize, histogram and argmax in a single pass over the pixels"""
+        hist[:] = 0
+        for i in range(image.shape[0]):
+            for j in range(image.shape[1]):
+                hist[((image[i, j, 0] >> 3) << 10) | ((image[i, j, 1] >> 3) << 5) | (image[i, j, 2] >> 3)] += 1
+        return hist.argmax()
+else:
+    _dominant_bin_kernel = None
+
 class ExperimentalColorTrader:
+    # Status-line spinner frames
+    _SPINNER_CHARS = ("⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏")
+    
+    # Signal codes stored in the color lookup table
+    _SIGNALS = (None, "LONG", "SHORT")
+    
+    # Order type shared by every entry/close order (Immediate or Cancel)
+    _IOC_LIMIT = {"limit": {"tif": "Ioc"}}
+    
+    # Static EIP-712 domain/types used for every signed action
+    _EIP712_DOMAIN = {
+        "chainId": 1337,
+        "name": "Exchange",
+        "verifyingContract": "0x0000000000000000000000000000000000000000",
+        "version": "1",
+    }
+    _EIP712_TYPES = {
+        "Agent": [
+            {"name": "source", "type": "string"},
+            {"name": "connectionId", "type": "bytes32"},
+        ],
+        "EIP712Domain": [
+            {"name": "name", "type": "string"},
+            {"name": "version", "type": "string"},
+            {"name": "chainId", "type": "uint256"},
+            {"name": "verifyingContract", "type": "address"},
+        ],
+    }
+    
     def __init__(self):
         """Initialize the Experimental Color Trader"""
         print("🎨 EXPERIMENTAL COLOR TRADER INITIALIZING...")
@@ -44,15 +104,41 @@ class ExperimentalColorTrader:
         # Load credentials
         self.load_credentials()
         
+        # Report physical pixels on scaled Windows displays so calibration matches the capture
+        if sys.platform == 'win32':
+            try:
+                ctypes.windll.user32.SetProcessDPIAware()
+            except (AttributeError, OSError):
+                pass
+        
+        # Reused msgpack encoder for action hashing
+        self._packer = msgpack.Packer()
+        
+        # Keep-alive aiohttp session for exchange requests (opened inside the event loop)
+        self._aio = None
+        
         # Screen capture settings
         self.screen_region = None  # Will be set during calibration
         self.capture_width = 100   # Width of capture region
         self.capture_height = 100  # Height of capture region
+        self._tls = threading.local()  # Per-thread mss grabber (see _get_sct)
+        self._monitor = None       # mss region dict matching screen_region
+        self._capture_region = None  # screen_region tuple the monitor/buffer were built for
+        self._frame_buf = None     # Reused (h, w, 3) frame buffer in the capture's native BGR order
+        self.analysis_size = (32, 32)  # Thumbnail (width, height) used for color analysis
+        self._hist = np.empty(1 << 15, dtype=np.uint32)  # Reused color-bin histogram (Numba path)
+        self._last_frame = None    # Last (dominant_color, signal) from the full classifier
+        self._last_frame_hash = None  # Hash of the last raw capture; unchanged pixels skip analysis
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)  # Frame capture/analysis worker
         
         # Color detection settings
         self.green_target = (76, 175, 80)    # Target green RGB 
         self.red_target = (241, 147, 65)     # Target red RGB (updated from your actual indicator!)
         self.color_tolerance = 80             # Increased tolerance for better matching
+        self.color_tolerance_sq = self.color_tolerance ** 2  # Compared against squared distances
+        self._green_target_native = self.green_target[::-1]  # BGR, matching the captured frames
+        self._red_target_native = self.red_target[::-1]
+        self._signal_lut = self.build_signal_lut()  # 15-bit color bin -> signal code
         
         # Trading settings
         self.position_usd = 4000.0           # $4000 position (40x leverage)
@@ -70,10 +156,12 @@ class ExperimentalColorTrader:
         self.current_signal = None           # "LONG", "SHORT", or None
         self.last_signal_time = 0
         self.signal_cooldown = 2.0           # Wait 2 seconds between signal checks
+        self._pending_signal = None          # Latest signal handed from capture to trade task
+        self._signal_changed = None          # asyncio.Event, created in run()
+        self.frame_interval = 0.5            # Minimum time between screen captures
         
         # Animation
-        self.spinner_chars = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
-        self.spinner_index = 0
+        self._spinner_iter = itertools.cycle(self._SPINNER_CHARS)
         
         print(f"💰 Position Size: ${self.position_usd:,.0f} (${self.actual_capital:.0f} of YOUR money)")
         print(f"🎯 Leverage: {self.leverage}x")
@@ -96,19 +184,34 @@ class ExperimentalColorTrader:
         self.address = self.account.address  # Store address like order_book_hunter
         
         # Initialize Hyperliquid clients
-        self.info = Info(constants.MAINNET_API_URL, skip_ws=True)
+        self.info = Info(constants.MAINNET_API_URL, skip_ws=False)
         self.exchange = Exchange(self.account, constants.MAINNET_API_URL)
         
+        # Keep the SOL mid updated from the allMids WebSocket feed
+        self._sol_mid = None
+        self._sol_mid_ts = 0.0     # time.monotonic() of the last allMids tick
+        self.max_mid_age = 5.0     # Seconds before the cached mid is considered stale
+        self.info.subscribe({"type": "allMids"}, self._on_mids)
+        
         print(f"✅ Wallet loaded: {self.address}")
         
-    def round_float(self, value: float, decimals: int = 2) -> str:
-        """Round float to string with proper precision"""
-        if decimals == 0:
-            return str(int(round(value)))
-        return f"{value:.{decimals}f}"
+    @staticmethod
+    def round_float_2(value: float) -> str:
+        """Format a SOL price/size with the fixed 2-decimal precision"""
+        return f"{value:.2f}"
+    
+    def _on_mids(self, msg: Dict[str, Any]):
+        """allMids WebSocket callback: cache the latest SOL mid"""
+        mid = msg.get('data', {}).get('mids', {}).get('SOL')
+        if mid is not None:
+            self._sol_mid = float(mid)
+            self._sol_mid_ts = time.monotonic()
     
     def get_current_price(self) -> Optional[float]:
-        """Get current SOL price"""
+        """Get current SOL price (WebSocket cache, REST when it is missing or stale)"""
+        if self._sol_mid is not None and time.monotonic() - self._sol_mid_ts < self.max_mid_age:
+            return self._sol_mid
+        
         try:
             all_mids = self.info.all_mids()
             if 'SOL' in all_mids:
@@ -130,9 +233,12 @@ class ExperimentalColorTrader:
         print("3. We'll help you select the right region to monitor")
         print()
         
-        # Get screen dimensions
-        screen_width, screen_height = pyautogui.size()
-        print(f"📺 Screen Size: {screen_width} x {screen_height}")
+        # Get screen bounds (all monitors combined, in physical pixels)
+        screen = self._get_sct().monitors[0]
+        screen_left, screen_top = screen['left'], screen['top']
+        screen_right = screen_left + screen['width']
+        screen_bottom = screen_top + screen['height']
+        print(f"📺 Screen Size: {screen['width']} x {screen['height']} (origin {screen_left}, {screen_top})")
         print()
         
         while True:
@@ -147,7 +253,8 @@ class ExperimentalColorTrader:
                 height = int(input("📏 Height: "))
                 
                 # Validate coordinates
-                if x < 0 or y < 0 or x + width > screen_width or y + height > screen_height:
+                if (width <= 0 or height <= 0 or x < screen_left or y < screen_top
+                        or x + width > screen_right or y + height > screen_bottom):
                     print("❌ Coordinates are outside screen bounds. Please try again.")
                     continue
                 
@@ -186,91 +293,151 @@ class ExperimentalColorTrader:
         
         print(f"\n🎯 Calibration complete! Monitoring region: {self.screen_region}")
     
+    def _get_sct(self):
+        """Get this thread's mss grabber (mss handles must not cross threads)"""
+        sct = getattr(self._tls, 'sct', None)
+        if sct is None:
+            sct = mss.mss()
+            self._tls.sct = sct
+        return sct
+    
     def capture_screen_region(self) -> Optional[np.ndarray]:
-        """Capture the specified screen region"""
+        """Capture the specified screen region into the reusable frame buffer"""
         try:
-            if self.screen_region is None:
+            # Read the region once; calibration swaps in a new immutable tuple
+            region = self.screen_region
+            if region is None:
                 print("❌ Screen region not set. Run calibration first.")
                 return None
             
-            # Capture screenshot of the region
-            screenshot = pyautogui.screenshot(region=self.screen_region)
+            x, y, width, height = region
+            
+            # Grabber (one per thread) and region dict are reused every frame;
+            # derived state is rebuilt only when a new region tuple is seen
+            sct = self._get_sct()
+            if region is not self._capture_region:
+                self._monitor = {'left': x, 'top': y, 'width': width, 'height': height}
+                if self._frame_buf is None or self._frame_buf.shape[:2] != (height, width):
+                    self._frame_buf = np.empty((height, width, 3), dtype=np.uint8)
+                self._last_frame = None  # Cached results belong to the old region
+                self._last_frame_hash = None
+                self._capture_region = region
             
-            # Convert PIL image to numpy array
-            img_array = np.array(screenshot)
+            # Grab only the requested rectangle (raw BGRA bytes)
+            shot = sct.grab(self._monitor)
+            bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(height, width, 4)
             
-            return img_array
+            # Drop alpha, keep native BGR order (targets are stored as BGR instead)
+            np.copyto(self._frame_buf, bgra[..., :3])
+            
+            return self._frame_buf
             
         except Exception as e:
             print(f"❌ Error capturing screen: {e}")
             return None
     
+    def downsample_image(self, image: np.ndarray) -> np.ndarray:
+        """Shrink the captured region to the analysis thumbnail size"""
+        width, height = self.analysis_size
+        if image.shape[1] <= width and image.shape[0] <= height:
+            return image
+        
+        # INTER_AREA box-filters the region so stray edge pixels don't skew the mode
+        return cv2.resize(image, self.analysis_size, interpolation=cv2.INTER_AREA)
+    
+    def get_dominant_bin(self, image: np.ndarray) -> int:
+        """Get the most populated 15-bit (5 bits per channel) color bin of a BGR image"""
+        if _dominant_bin_kernel is not None:
+            return int(_dominant_bin_kernel(image, self._hist))
+        
+        # Quantize to 5 bits per channel and pack into a 15-bit bin index
+        q = image >> 3
+        idx = (q[..., 0].astype(np.uint32) << 10) | (q[..., 1].astype(np.uint32) << 5) | q[..., 2]
+        
+        # Most populated bin is the dominant color
+        counts = np.bincount(idx.ravel(), minlength=1 << 15)
+        return int(counts.argmax())
+    
     def get_dominant_color(self, image: np.ndarray) -> Tuple[int, int, int]:
         """Get the dominant color in the image region"""
         try:
-            # Reshape image to list of pixels
-            pixels = image.reshape(-1, 3)
-            
-            # Use k-means clustering to find dominant color
-            from sklearn.cluster import KMeans
+            top = self.get_dominant_bin(self.downsample_image(image))
             
-            # Use 3 clusters to find main colors
-            kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
-            kmeans.fit(pixels)
+            # Unquantize the BGR bin back to RGB
+            return ((top & 31) << 3, ((top >> 5) & 31) << 3, ((top >> 10) & 31) << 3)
             
-            # Get the cluster centers (dominant colors)
-            colors = kmeans.cluster_centers_.astype(int)
-            
-            # Get the most frequent cluster (dominant color)
-            labels = kmeans.labels_
-            unique, counts = np.unique(labels, return_counts=True)
-            dominant_cluster = unique[np.argmax(counts)]
-            dominant_color = colors[dominant_cluster]
-            
-            return tuple(dominant_color)
-            
-        except ImportError:
-            # Fallback: simple average if sklearn not available
-            print("⚠️  sklearn not available, using simple average")
-            avg_color = np.mean(image.reshape(-1, 3), axis=0).astype(int)
-            return tuple(avg_color)
         except Exception as e:
             print(f"❌ Error getting dominant color: {e}")
             # Return a neutral color
             return (128, 128, 128)
     
-    def color_distance(self, color1: Tuple[int, int, int], color2: Tuple[int, int, int]) -> float:
-        """Calculate Euclidean distance between two RGB colors"""
-        return np.sqrt(sum((c1 - c2) ** 2 for c1, c2 in zip(color1, color2)))
+    def build_signal_lut(self) -> np.ndarray:
+        """Precompute the signal code (0=neutral, 1=LONG, 2=SHORT) for every BGR color bin"""
+        bins = np.arange(1 << 15, dtype=np.int32)
+        bgr = np.stack(((bins >> 10) & 31, (bins >> 5) & 31, bins & 31), axis=1) << 3
+        
+        green_d2 = ((bgr - np.array(self._green_target_native)) ** 2).sum(axis=1)
+        red_d2 = ((bgr - np.array(self._red_target_native)) ** 2).sum(axis=1)
+        
+        lut = np.zeros(1 << 15, dtype=np.uint8)
+        lut[(green_d2 <= self.color_tolerance_sq) & (green_d2 < red_d2)] = 1
+        lut[(red_d2 <= self.color_tolerance_sq) & (red_d2 < green_d2)] = 2
+        return lut
+    
+    def color_distance(self, color1: Tuple[int, int, int], color2: Tuple[int, int, int]) -> int:
+        """Calculate squared Euclidean distance between two colors (same channel order)"""
+        dr = int(color1[0]) - color2[0]
+        dg = int(color1[1]) - color2[1]
+        db = int(color1[2]) - color2[2]
+        return dr * dr + dg * dg + db * db
     
     def detect_color_signal(self, dominant_color: Tuple[int, int, int]) -> Optional[str]:
-        """Detect trading signal based on dominant color"""
+        """Detect trading signal based on dominant color (looked up by its color bin)"""
         try:
-            green_distance = self.color_distance(dominant_color, self.green_target)
-            red_distance = self.color_distance(dominant_color, self.red_target)
-            
-            # Check if color is close enough to either target
-            if green_distance <= self.color_tolerance and green_distance < red_distance:
-                return "LONG"
-            elif red_distance <= self.color_tolerance and red_distance < green_distance:
-                return "SHORT"
-            else:
-                return None  # No clear signal
+            r, g, b = (int(c) >> 3 for c in dominant_color)
+            return self._SIGNALS[self._signal_lut[(b << 10) | (g << 5) | r]]
                 
         except Exception as e:
             print(f"❌ Error detecting color signal: {e}")
             return None
     
+    def _analyze_frame(self) -> Optional[Tuple[Tuple[int, int, int], Optional[str]]]:
+        """Capture the region and classify it (runs on the frame worker thread)"""
+        image = self.capture_screen_region()
+        if image is None:
+            return None
+        
+        # Identical pixels -> identical answer
+        frame_hash = _frame_hash(image)
+        if frame_hash == self._last_frame_hash and self._last_frame is not None:
+            return self._last_frame
+        self._last_frame_hash = frame_hash
+        
+        thumb = self.downsample_image(image)
+        
+        # Fast path: mean color still well inside the last signal's target -> reuse it
+        if self._last_frame is not None and self._last_frame[1] is not None:
+            n = thumb.shape[0] * thumb.shape[1]
+            channel_sums = thumb.reshape(-1, 3).sum(axis=0, dtype=np.uint64)
+            mean_color = (int(channel_sums[0]) // n, int(channel_sums[1]) // n, int(channel_sums[2]) // n)
+            green_distance = self.color_distance(mean_color, self._green_target_native)
+            red_distance = self.color_distance(mean_color, self._red_target_native)
+            closer = "LONG" if green_distance < red_distance else "SHORT"
+            if closer == self._last_frame[1] and min(green_distance, red_distance) < self.color_tolerance_sq // 4:
+                return self._last_frame
+        
+        dominant_color = self.get_dominant_color(thumb)
+        self._last_frame = (dominant_color, self.detect_color_signal(dominant_color))
+        return self._last_frame
+    
     def get_spinner(self) -> str:
         """Get next spinner character"""
-        char = self.spinner_chars[self.spinner_index]
-        self.spinner_index = (self.spinner_index + 1) % len(self.spinner_chars)
-        return char
+        return next(self._spinner_iter)
     
     # Copy EXACT working signing logic from ultimate_scalping_bot.py and order_book_hunter.py
     def hash_action(self, action, vault, nonce) -> bytes:
         """Hash the action for signing"""
-        data = msgpack.packb(action)
+        data = self._packer.pack(action)
         data += nonce.to_bytes(8, "big")
         
         if vault is None:
@@ -293,31 +460,31 @@ class ExperimentalColorTrader:
     def sign_action(self, action: dict, vault: str | None, nonce: int, is_mainnet: bool) -> dict:
         """Sign an action with proper EIP-712 format"""
         h = self.hash_action(action, vault, nonce)
-        msg = {"source": "a" if is_mainnet else "b", "connectionId": to_hex(h)}
+        msg = {"source": "a" if is_mainnet else "b", "connectionId": h}
         data = {
-            "domain": {
-                "chainId": 1337,
-                "name": "Exchange",
-                "verifyingContract": "0x0000000000000000000000000000000000000000",
-                "version": "1",
-            },
-            "types": {
-                "Agent": [
-                    {"name": "source", "type": "string"},
-                    {"name": "connectionId", "type": "bytes32"},
-                ],
-                "EIP712Domain": [
-                    {"name": "name", "type": "string"},
-                    {"name": "version", "type": "string"},
-                    {"name": "chainId", "type": "uint256"},
-                    {"name": "verifyingContract", "type": "address"},
-                ],
-            },
+            "domain": self._EIP712_DOMAIN,
+            "types": self._EIP712_TYPES,
             "primaryType": "Agent",
             "message": msg,
         }
         return self.sign_inner(data)
     
+    async def open_http_session(self):
+        """Open the shared aiohttp session and warm up its TLS connection"""
+        if self._aio is None or self._aio.closed:
+            self._aio = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4, ttl_dns_cache=300),
+                headers={"Content-Type": "application/json"},
+                timeout=aiohttp.ClientTimeout(total=10),
+            )
+        
+        try:
+            # Open the connection now so the first order doesn't pay the handshake
+            async with self._aio.head(constants.MAINNET_API_URL):
+                pass
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+    
     async def place_order_raw(self, action: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Place order using raw API call"""
         try:
@@ -337,18 +504,18 @@ class ExperimentalColorTrader:
                 "vaultAddress": vault
             }
             
-            # Make the request
+            # Make the request (non-blocking, on the shared keep-alive session)
             url = "https://api.hyperliquid.xyz/exchange"
-            headers = {"Content-Type": "application/json"}
-            
-            response = requests.post(url, json=payload, headers=headers)
+            if self._aio is None or self._aio.closed:
+                await self.open_http_session()
             
-            if response.status_code == 200:
-                result = response.json()
-                return result
-            else:
-                print(f"❌ Order failed: {response.status_code} - {response.text}")
-                return None
+            async with self._aio.post(url, data=orjson.dumps(payload)) as response:
+                if response.status == 200:
+                    result = orjson.loads(await response.read())
+                    return result
+                else:
+                    print(f"❌ Order failed: {response.status} - {await response.text()}")
+                    return None
                 
         except Exception as e:
             print(f"❌ Error placing order: {e}")
@@ -383,10 +550,10 @@ class ExperimentalColorTrader:
                 "orders": [{
                     "a": 5,  # SOL asset ID
                     "b": is_buy,
-                    "p": self.round_float(order_price, 2),
-                    "s": self.round_float(position_size_sol, 2),
+                    "p": self.round_float_2(order_price),
+                    "s": self.round_float_2(position_size_sol),
                     "r": False,  # Not reduce only
-                    "t": {"limit": {"tif": "Ioc"}}  # Immediate or Cancel
+                    "t": self._IOC_LIMIT  # Immediate or Cancel
                 }],
                 "grouping": "na"
             }
@@ -465,10 +632,10 @@ class ExperimentalColorTrader:
                 "orders": [{
                     "a": 5,  # SOL asset ID
                     "b": is_buy,
-                    "p": self.round_float(close_price, 2),
-                    "s": self.round_float(self.position_size, 2),
+                    "p": self.round_float_2(close_price),
+                    "s": self.round_float_2(self.position_size),
                     "r": True,  # Reduce only
-                    "t": {"limit": {"tif": "Ioc"}}  # Immediate or Cancel
+                    "t": self._IOC_LIMIT  # Immediate or Cancel
                 }],
                 "grouping": "na"
             }
@@ -512,6 +679,26 @@ class ExperimentalColorTrader:
                 self.position_direction = None
                 self.current_position = None
     
+    async def wait_for_position_closed(self, timeout: float = 10.0) -> bool:
+        """Poll user state with exponential backoff until no SOL position remains"""
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        
+        while time.monotonic() < deadline:
+            try:
+                state = await loop.run_in_executor(None, self.info.user_state, self.address)
+                positions = state.get('assetPositions', [])
+                if not any(p['position']['coin'] == 'SOL' and float(p['position']['szi']) != 0 for p in positions):
+                    return True
+            except Exception as e:
+                print(f"⚠️  Error checking user state: {e}")
+            
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+        
+        return False
+    
     async def flip_position(self, new_direction: str):
         """Flip position from current to new direction"""
         current_price = self.get_current_price()
@@ -531,9 +718,10 @@ class ExperimentalColorTrader:
                     print("❌ Failed to close current position")
                     return False
                 
-                # Wait 10 seconds for margin to be released
-                print("⏳ Waiting 10 seconds for margin to be released...")
-                await asyncio.sleep(10.0)
+                # Wait (up to 10 seconds) for the exchange to show the position closed
+                print("⏳ Waiting for margin to be released...")
+                if not await self.wait_for_position_closed(timeout=10.0):
+                    print("⚠️  Position still showing after 10s, opening anyway")
             
             # Step 2: Open new position
             print(f"🚀 Opening new {new_direction.upper()} position...")
@@ -551,6 +739,71 @@ class ExperimentalColorTrader:
             print(f"❌ Error flipping position: {e}")
             return False
     
+    async def _capture_task(self):
+        """Sample the screen and publish signal changes to the trade task"""
+        last_color_display = 0
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            current_time = time.time()
+            
+            # Capture screen and detect color
+            try:
+                # Capture screen region and detect signal off the event loop
+                frame = await loop.run_in_executor(self._pool, self._analyze_frame)
+                if frame is not None:
+                    dominant_color, signal = frame
+                    
+                    # Display color info every 5 seconds
+                    if current_time - last_color_display >= 5.0:
+                        timestamp = datetime.now().strftime("%H:%M:%S")
+                        spinner = self.get_spinner()
+                        
+                        # Format color display
+                        color_str = f"RGB{dominant_color}"
+                        signal_str = "🟢 LONG" if signal == "LONG" else "🔴 SHORT" if signal == "SHORT" else "⚪ NEUTRAL"
+                        position_str = f"📍 {self.current_position.upper()}" if self.current_position else "📍 NO POSITION"
+                        
+                        print(f"{spinner} [{timestamp}] Color: {color_str} | Signal: {signal_str} | {position_str}")
+                        last_color_display = current_time
+                    
+                    # Handle signal changes
+                    if signal and signal != self.current_signal:
+                        print(f"\n🚨 COLOR SIGNAL DETECTED: {signal}!")
+                        print(f"   Dominant Color: RGB{dominant_color}")
+                        
+                        # Hand the latest signal to the trade task
+                        self._pending_signal = signal
+                        self._signal_changed.set()
+                        
+                        self.current_signal = signal
+                        self.last_signal_time = current_time
+                
+            except Exception as e:
+                print(f"❌ Error in color detection: {e}")
+            
+            # Sleep until the next frame is due (and the signal cooldown has passed)
+            next_due = max(current_time + self.frame_interval, self.last_signal_time + self.signal_cooldown)
+            await asyncio.sleep(max(0.0, next_due - time.time()))
+    
+    async def _trade_task(self):
+        """Flip the position whenever the capture task reports a new signal"""
+        while True:
+            await self._signal_changed.wait()
+            self._signal_changed.clear()
+            signal = self._pending_signal
+            
+            # Check if we need to flip position
+            if signal.lower() != self.current_position:
+                print(f"   Position Change Required: {self.current_position} → {signal.lower()}")
+                
+                # Flip position
+                success = await self.flip_position(signal.lower())
+                if success:
+                    print(f"✅ Successfully flipped to {signal}!")
+                else:
+                    print(f"❌ Failed to flip to {signal}")
+    
     async def run(self):
         """Main trading loop"""
         try:
@@ -565,65 +818,17 @@ class ExperimentalColorTrader:
             # Calibrate screen region
             self.calibrate_screen_region()
             
+            # Connect to the exchange before the first signal arrives
+            await self.open_http_session()
+            
             print("\n🚀 STARTING COLOR DETECTION TRADING...")
             print("Press Ctrl+C to stop")
             print()
             
-            last_color_display = 0
+            # Capture and trading run side by side so a slow flip never blinds the capture
+            self._signal_changed = asyncio.Event()
+            await asyncio.gather(self._capture_task(), self._trade_task())
             
-            while True:
-                current_time = time.time()
-                
-                # Capture screen and detect color
-                if current_time - self.last_signal_time >= self.signal_cooldown:
-                    try:
-                        # Capture screen region
-                        image = self.capture_screen_region()
-                        if image is not None:
-                            # Get dominant color
-                            dominant_color = self.get_dominant_color(image)
-                            
-                            # Detect signal
-                            signal = self.detect_color_signal(dominant_color)
-                            
-                            # Display color info every 5 seconds
-                            if current_time - last_color_display >= 5.0:
-                                timestamp = datetime.now().strftime("%H:%M:%S")
-                                spinner = self.get_spinner()
-                                
-                                # Format color display
-                                color_str = f"RGB{dominant_color}"
-                                signal_str = "🟢 LONG" if signal == "LONG" else "🔴 SHORT" if signal == "SHORT" else "⚪ NEUTRAL"
-                                position_str = f"📍 {self.current_position.upper()}" if self.current_position else "📍 NO POSITION"
-                                
-                                print(f"{spinner} [{timestamp}] Color: {color_str} | Signal: {signal_str} | {position_str}")
-                                last_color_display = current_time
-                            
-                            # Handle signal changes
-                            if signal and signal != self.current_signal:
-                                print(f"\n🚨 COLOR SIGNAL DETECTED: {signal}!")
-                                print(f"   Dominant Color: RGB{dominant_color}")
-                                
-                                # Check if we need to flip position
-                                if signal.lower() != self.current_position:
-                                    print(f"   Position Change Required: {self.current_position} → {signal.lower()}")
-                                    
-                                    # Flip position
-                                    success = await self.flip_position(signal.lower())
-                                    if success:
-                                        print(f"✅ Successfully flipped to {signal}!")
-                                    else:
-                                        print(f"❌ Failed to flip to {signal}")
-                                
-                                self.current_signal = signal
-                                self.last_signal_time = current_time
-                        
-                    except Exception as e:
-                        print(f"❌ Error in color detection: {e}")
-                
-                # Small delay to prevent excessive CPU usage
-                await asyncio.sleep(0.5)
-                
         except KeyboardInterrupt:
             print("\n\n🛑 Shutting down Color Trader...")
             
@@ -644,7 +849,16 @@ class ExperimentalColorTrader:
                     await self.close_position()
                 except:
                     pass
+        
+        finally:
+            self._pool.shutdown(wait=False)
+            if self._aio is not None:
+                await self._aio.close()
+            self.info.disconnect_websocket()
 
 if __name__ == "__main__":
     bot = ExperimentalColorTrader()
-    asyncio.run(bot.run())
\ No newline at end of file
+    if uvloop is not None:
+        uvloop.run(bot.run())
+    else:
+        asyncio.run(bot.run())
\ No newline at end of file
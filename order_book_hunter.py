@@ -12,28 +12,94 @@ Strategy:
 """
 
 import asyncio
-import websockets
-import json
+import aiohttp
+import orjson
 import time
+import threading
 import hashlib
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import numpy as np
 from collections import deque
 import requests
+from requests.adapters import HTTPAdapter
 from eth_account import Account
 from eth_account.messages import encode_typed_data
 from eth_utils.crypto import keccak
 from eth_utils.conversions import to_hex
 import msgpack
-from decimal import Decimal
 from hyperliquid.info import Info
 from hyperliquid.exchange import Exchange
 from hyperliquid.utils import constants
 import os
 from dotenv import load_dotenv
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None  # Numba is optional; get_recent_volume falls back to NumPy
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None  # Optional faster event loop (not available on Windows)
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _volume_ratio_kernel(bid_size, ask_size, mid_price, head, count):
+        """Recent vs average book-change volume proxy straight off the ring buffers"""
+        size = bid_size.shape[0]
+        if count < 10:
+            return 1.0
+        
+        # Last 9 steps (10 snapshots)
+        recent = 0.0
+        for i in range(1, 10):
+            curr = (head - i + size) % size
+            prev = (head - i - 1 + size) % size
+            recent += abs((bid_size[curr] + ask_size[curr]) - (bid_size[prev] + ask_size[prev]))
+            recent += abs(mid_price[curr] - mid_price[prev]) * 1000
+        
+        if count < 30:
+            return 1.0
+        
+        # The 20 steps before those
+        avg = 0.0
+        for i in range(10, min(30, count - 1)):
+            curr = (head - i + size) % size
+            prev = (head - i - 1 + size) % size
+            avg += abs((bid_size[curr] + ask_size[curr]) - (bid_size[prev] + ask_size[prev]))
+            avg += abs(mid_price[curr] - mid_price[prev]) * 1000
+        
+        avg = avg / 20 if avg > 0 else 1.0
+        return (recent / 10) / avg
+else:
+    _volume_ratio_kernel = None
+
 class OrderBookHunter:
+    # Fixed attribute set: slot access on the hot path, no per-instance __dict__
+    __slots__ = (
+        # Clients and credentials
+        'account', 'address', 'info', 'exchange', '_http', '_sig_template',
+        '_last_nonce', '_nonce_lock', '_packer', '_pack_lock',
+        # Strategy parameters
+        'coin', 'asset_index', 'leverage',
+        '_entry_tmpl', '_sl_tmpl', '_tp_tmpl', '_close_tmpl',
+        'book_depth', 'imbalance_threshold', 'short_imbalance_threshold',
+        'volume_spike_threshold', 'min_spread_bps',
+        'base_position_usd', 'max_position_usd', 'base_capital_required', 'max_capital_required',
+        'tp_percentage', 'sl_percentage', 'time_stop_seconds',
+        '_tp_long_mul', '_tp_short_mul', '_sl_long_mul', '_sl_short_mul', '_cap_base', '_cap_max',
+        # Data tracking
+        'history_size', 'history_time', 'history_bid_size', 'history_ask_size', 'history_mid_price',
+        'history_head', 'history_count', '_last_mid', '_last_log_ts',
+        'volume_history', 'last_update_time',
+        # Position state
+        'position_open', 'entry_time', 'entry_price', 'entry_order_data',
+        'position_direction', 'position_size',
+        'ws_url',
+    )
+    
     def __init__(self):
         """Initialize the Order Book Imbalance Hunter"""
         print("🎯 ORDER BOOK IMBALANCE HUNTER INITIALIZING...")
@@ -46,13 +112,60 @@ class OrderBookHunter:
         self.info = Info(constants.MAINNET_API_URL, skip_ws=True)
         self.exchange = Exchange(self.account, constants.MAINNET_API_URL)
         
+        # Pooled keep-alive HTTPS session for /exchange posts
+        self._http = requests.Session()
+        self._http.mount("https://api.hyperliquid.xyz", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._http.headers["Content-Type"] = "application/json"
+        self._last_nonce = 0  # Nonces must be unique when actions go out concurrently
+        self._nonce_lock = threading.Lock()
+        
+        # Reused msgpack encoder for action hashing (cancel/close hash from two threads)
+        self._packer = msgpack.Packer()
+        self._pack_lock = threading.Lock()
+        if msgpack.Packer.__module__ == 'msgpack.fallback':
+            print("⚠️ msgpack C extension not available - action hashing will be slow")
+        
+        # Static EIP-712 typed-data skeleton; sign_action only fills in the message
+        self._sig_template = {
+            "domain": {
+                "chainId": 1337,
+                "name": "Exchange",
+                "verifyingContract": "0x0000000000000000000000000000000000000000",
+                "version": "1",
+            },
+            "types": {
+                "Agent": [
+                    {"name": "source", "type": "string"},
+                    {"name": "connectionId", "type": "bytes32"},
+                ],
+                "EIP712Domain": [
+                    {"name": "name", "type": "string"},
+                    {"name": "version", "type": "string"},
+                    {"name": "chainId", "type": "uint256"},
+                    {"name": "verifyingContract", "type": "address"},
+                ],
+            },
+            "primaryType": "Agent",
+            "message": None,
+        }
+        
         # Strategy parameters
         self.coin = 'SOL'
         self.asset_index = 5  # SOL
         self.leverage = 20
         
+        # Order skeletons; only side/price/size (and trigger) are filled per trade.
+        # Key order matters - it is part of the msgpack bytes that get signed.
+        ioc = {"limit": {"tif": "Ioc"}}  # Immediate or cancel
+        self._entry_tmpl = {"a": self.asset_index, "b": None, "p": None, "s": None, "r": False, "t": ioc}
+        self._sl_tmpl = {"a": self.asset_index, "b": None, "p": None, "s": None, "r": True, "t": None}
+        self._tp_tmpl = {"a": self.asset_index, "b": None, "p": None, "s": None, "r": True, "t": None}
+        self._close_tmpl = {"a": self.asset_index, "b": None, "p": None, "s": None, "r": True, "t": ioc}
+        
         # Imbalance detection parameters
-        self.imbalance_threshold = 3.0  # 3:1 ratio for strong imbalance
+        self.book_depth = 5  # Levels per side used for the imbalance
+        self.imbalance_threshold = 0.5  # Normalized (B-A)/(B+A); 0.5 == 3:1 bid/ask
+        self.short_imbalance_threshold = -1 / 3  # == 1:2 bid/ask
         self.volume_spike_threshold = 1.5  # 1.5x average volume spike (more realistic)
         self.min_spread_bps = 0  # No minimum spread - SOL is super liquid
         
@@ -67,8 +180,25 @@ class OrderBookHunter:
         self.sl_percentage = 0.10  # 0.10% stop loss (2.5:1 RR)
         self.time_stop_seconds = 30  # Exit if no movement
         
+        # Fixed TP/SL price multipliers and capital-at-risk bases, computed once
+        self._tp_long_mul = 1 + self.tp_percentage / 100
+        self._tp_short_mul = 1 - self.tp_percentage / 100
+        self._sl_long_mul = 1 - self.sl_percentage / 100
+        self._sl_short_mul = 1 + self.sl_percentage / 100
+        self._cap_base = self.base_position_usd / self.leverage
+        self._cap_max = self.max_position_usd / self.leverage
+        
         # Data tracking
-        self.orderbook_history = deque(maxlen=50)  # Last 50 snapshots
+        # Last 50 book snapshots as struct-of-arrays ring buffers
+        self.history_size = 50
+        self.history_time = np.empty(self.history_size, dtype=np.float64)
+        self.history_bid_size = np.empty(self.history_size, dtype=np.float64)
+        self.history_ask_size = np.empty(self.history_size, dtype=np.float64)
+        self.history_mid_price = np.empty(self.history_size, dtype=np.float64)
+        self.history_head = 0  # Next write slot
+        self.history_count = 0  # Filled slots (<= history_size)
+        self._last_mid = 0.0  # Latest mid from the streamed book (0 until the first update)
+        self._last_log_ts = 0.0  # Status line is refreshed at most 4x per second
         self.volume_history = deque(maxlen=30)  # 30 seconds of volume
         self.last_update_time = 0
         self.position_open = False
@@ -79,19 +209,15 @@ class OrderBookHunter:
         self.position_size = None  # Actual filled size
         
         # WebSocket URL for real-time data
-        self.ws_url = "wss://api.hyperliquid-testnet.xyz/ws"  # Will switch to mainnet
+        self.ws_url = "wss://api.hyperliquid.xyz/ws"  # Mainnet
         
     def load_credentials(self):
         """Load credentials from .env file"""
-        env_vars = {}
-        with open('.env', 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    env_vars[key] = value
-        
-        private_key = env_vars.get('HYPERLIQUID_PRIVATE_KEY')
+        load_dotenv()
+        
+        private_key = os.getenv('HYPERLIQUID_PRIVATE_KEY')
+        if not private_key:
+            raise ValueError("HYPERLIQUID_PRIVATE_KEY not found in .env file")
         self.account = Account.from_key(private_key)
         self.address = self.account.address
         print(f'🔑 Wallet: {self.address}')
@@ -101,10 +227,9 @@ class OrderBookHunter:
         rounded = f"{x:.8f}"
         if abs(float(rounded) - x) >= 1e-12:
             raise ValueError("round_float causes rounding", x)
-        if rounded == "-0":
-            rounded = "0"
-        normalized = Decimal(rounded).normalize()
-        return f"{normalized:f}"
+        # Strip trailing zeros / dot instead of a Decimal round-trip
+        rounded = rounded.rstrip("0").rstrip(".")
+        return "0" if rounded == "-0" else rounded
     
     def get_current_price(self):
         """Get current SOL price"""
@@ -118,7 +243,8 @@ class OrderBookHunter:
     
     def hash_action(self, action, vault, nonce) -> bytes:
         """Hash the action for signing"""
-        data = msgpack.packb(action)
+        with self._pack_lock:
+            data = self._packer.pack(action)
         data += nonce.to_bytes(8, "big")
         
         if vault is None:
@@ -141,31 +267,17 @@ class OrderBookHunter:
     def sign_action(self, action: dict, vault: str | None, nonce: int, is_mainnet: bool) -> dict:
         """Sign an action with proper EIP-712 format"""
         h = self.hash_action(action, vault, nonce)
-        msg = {"source": "a" if is_mainnet else "b", "connectionId": h}
-        data = {
-            "domain": {
-                "chainId": 1337,
-                "name": "Exchange",
-                "verifyingContract": "0x0000000000000000000000000000000000000000",
-                "version": "1",
-            },
-            "types": {
-                "Agent": [
-                    {"name": "source", "type": "string"},
-                    {"name": "connectionId", "type": "bytes32"},
-                ],
-                "EIP712Domain": [
-                    {"name": "name", "type": "string"},
-                    {"name": "version", "type": "string"},
-                    {"name": "chainId", "type": "uint256"},
-                    {"name": "verifyingContract", "type": "address"},
-                ],
-            },
-            "primaryType": "Agent",
-            "message": msg,
-        }
+        data = self._sig_template.copy()
+        data["message"] = {"source": "a" if is_mainnet else "b", "connectionId": h}
         return self.sign_inner(data)
     
+    def next_nonce(self) -> int:
+        """Millisecond nonce, bumped if needed so concurrent actions never share one"""
+        with self._nonce_lock:
+            nonce = max(time.time_ns() // 1_000_000, self._last_nonce + 1)
+            self._last_nonce = nonce
+        return nonce
+    
     def place_order_raw(self, order):
         """Place order using raw API"""
         action = {
@@ -174,7 +286,7 @@ class OrderBookHunter:
             "grouping": "na"  # No grouping for simple orders
         }
         
-        nonce = int(time.time() * 1000)
+        nonce = self.next_nonce()
         signature = self.sign_action(action, None, nonce, True)
         
         payload = {
@@ -184,14 +296,13 @@ class OrderBookHunter:
             "vaultAddress": None
         }
         
-        response = requests.post(
+        response = self._http.post(
             "https://api.hyperliquid.xyz/exchange",
-            headers={"Content-Type": "application/json"},
-            json=payload
+            data=orjson.dumps(payload)
         )
         
         if response.status_code == 200:
-            return response.json()
+            return orjson.loads(response.content)
         else:
             return {"status": "error", "error": f"HTTP {response.status_code}"}
     
@@ -203,7 +314,7 @@ class OrderBookHunter:
             "grouping": "normalTpsl"  # THE MAGIC GROUPING!
         }
         
-        nonce = int(time.time() * 1000)
+        nonce = self.next_nonce()
         signature = self.sign_action(action, None, nonce, True)
         
         payload = {
@@ -214,14 +325,13 @@ class OrderBookHunter:
         }
         
         print("🚀 Placing grouped order with TP/SL...")
-        response = requests.post(
+        response = self._http.post(
             "https://api.hyperliquid.xyz/exchange",
-            headers={"Content-Type": "application/json"},
-            json=payload
+            data=orjson.dumps(payload)
         )
         
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             if result.get('status') == 'ok':
                 statuses = result.get('response', {}).get('data', {}).get('statuses', [])
                 print(f'📊 Order statuses: {statuses}')
@@ -229,12 +339,37 @@ class OrderBookHunter:
         else:
             return {"status": "error", "error": f"HTTP {response.status_code}"}
         
+    def cancel_all_raw(self):
+        """Cancel all resting orders for the coin using raw API"""
+        action = {
+            "type": "cancel",
+            "cancels": [{"a": self.asset_index, "o": ""}]  # Cancel all orders for SOL
+        }
+        
+        nonce = self.next_nonce()
+        signature = self.sign_action(action, None, nonce, True)
+        
+        payload = {
+            "action": action,
+            "nonce": nonce,
+            "signature": signature,
+            "vaultAddress": None
+        }
+        
+        response = self._http.post(
+            "https://api.hyperliquid.xyz/exchange",
+            data=orjson.dumps(payload)
+        )
+        
+        if response.status_code == 200:
+            return orjson.loads(response.content)
+        else:
+            return {"status": "error", "error": f"HTTP {response.status_code}"}
+        
     async def connect_websocket(self):
         """Connect to Hyperliquid WebSocket for real-time data"""
-        # For mainnet
-        ws_url = "wss://api.hyperliquid.xyz/ws"
-        
-        async with websockets.connect(ws_url) as websocket:
+        async with aiohttp.ClientSession() as session, \
+                session.ws_connect(self.ws_url, heartbeat=20, compress=0, max_msg_size=2**20) as websocket:
             # Subscribe to L2 book and trades
             subscribe_msg = {
                 "method": "subscribe",
@@ -243,7 +378,7 @@ class OrderBookHunter:
                     "coin": self.coin
                 }
             }
-            await websocket.send(json.dumps(subscribe_msg))
+            await websocket.send_str(orjson.dumps(subscribe_msg).decode())
             
             # Also subscribe to trades for volume
             trades_msg = {
@@ -253,51 +388,95 @@ class OrderBookHunter:
                     "coin": self.coin
                 }
             }
-            await websocket.send(json.dumps(trades_msg))
+            await websocket.send_str(orjson.dumps(trades_msg).decode())
             
             print(f"✅ Connected to WebSocket! Hunting for imbalances...")
             
-            # Process messages
+            # Reader task queues raw frames; we wait for one, then drain whatever piled up
+            queue = asyncio.Queue()
+            reader = asyncio.create_task(self.read_messages(websocket, queue))
+            try:
+                while True:
+                    batch = [await queue.get()]
+                    while not queue.empty():
+                        batch.append(queue.get_nowait())
+                    if batch[-1] is None:  # Reader finished (connection closed)
+                        await self.process_market_data(batch[:-1])
+                        await reader  # Re-raise whatever closed the connection
+                        return
+                    await self.process_market_data(batch)
+            finally:
+                reader.cancel()
+                
+    async def read_messages(self, websocket, queue: asyncio.Queue):
+        """Push raw WebSocket frames onto the queue, None when the stream ends"""
+        try:
             async for message in websocket:
-                data = json.loads(message)
-                await self.process_market_data(data)
+                if message.type == aiohttp.WSMsgType.TEXT:
+                    queue.put_nowait(message.data)
+                elif message.type == aiohttp.WSMsgType.ERROR:
+                    raise websocket.exception() or ConnectionError("WebSocket error frame")
+        finally:
+            queue.put_nowait(None)
                 
-    async def process_market_data(self, data: dict):
-        """Process incoming market data"""
-        if data.get('channel') == 'l2Book':
-            await self.analyze_orderbook(data['data'])
-        elif data.get('channel') == 'trades':
-            self.update_volume(data['data'])
+    async def process_market_data(self, messages: List):
+        """Process a burst of market data: latest book only, all trades"""
+        latest_book = None
+        pending_trades = []
+        for message in messages:
+            data = orjson.loads(message)
+            channel = data.get('channel')
+            if channel == 'l2Book':
+                latest_book = data['data']
+            elif channel == 'trades':
+                pending_trades.extend(data['data'])
+        
+        if pending_trades:
+            self.update_volume(pending_trades)
+        if latest_book is not None:
+            await self.analyze_orderbook(latest_book)
             
     async def analyze_orderbook(self, orderbook_data: dict):
         """Analyze order book for imbalances"""
         try:
             # Extract bid/ask data
-            bids = orderbook_data.get('levels', [[], []])[0]  # [[price, size], ...]
+            bids = orderbook_data.get('levels', [[], []])[0]  # [{'px': ..., 'sz': ..., 'n': ...}, ...]
             asks = orderbook_data.get('levels', [[], []])[1]
             
             if not bids or not asks:
                 return
                 
-            # Calculate total bid/ask sizes (top 5 levels)
-            bid_size = sum(float(level[1]) for level in bids[:5])
-            ask_size = sum(float(level[1]) for level in asks[:5])
-            
-            # Calculate imbalance ratio
+            # Cumulative depth over each side's own top levels
+            bid_depth = min(self.book_depth, len(bids))
+            ask_depth = min(self.book_depth, len(asks))
+            cum_bid = np.cumsum(np.fromiter((level['sz'] for level in bids[:bid_depth]), np.float64, bid_depth))
+            cum_ask = np.cumsum(np.fromiter((level['sz'] for level in asks[:ask_depth]), np.float64, ask_depth))
+            bid_size = cum_bid[-1]
+            ask_size = cum_ask[-1]
+            
+            # Normalized imbalance in [-1, 1] drives the signal; OIQ averages it over the common depths
+            total_size = bid_size + ask_size
+            imbalance = (bid_size - ask_size) / total_size if total_size > 0 else 0.0
+            depth = min(bid_depth, ask_depth)
+            oiq = float(np.mean(cum_bid[:depth] / cum_ask[:depth] - 1)) if cum_ask[0] > 0 else 0.0
+            
+            # Plain ratio is kept for sizing and display
             if ask_size > 0:
                 imbalance_ratio = bid_size / ask_size
             else:
                 imbalance_ratio = 999  # Extreme bullish
                 
             # Get best bid/ask
-            best_bid = float(bids[0][0])
-            best_ask = float(asks[0][0])
-            mid_price = (best_bid + best_ask) / 2
+            best_bid = float(bids[0]['px'])
+            best_ask = float(asks[0]['px'])
+            mid_price = 0.5 * (best_bid + best_ask)
             spread_bps = ((best_ask - best_bid) / mid_price) * 10000
             
-            # Store snapshot
+            # Snapshot for the entry logic
             snapshot = {
-                'time': time.time(),
+                'time': time.monotonic(),
+                'imbalance': imbalance,
+                'oiq': oiq,
                 'imbalance_ratio': imbalance_ratio,
                 'bid_size': bid_size,
                 'ask_size': ask_size,
@@ -306,22 +485,27 @@ class OrderBookHunter:
                 'best_bid': best_bid,
                 'best_ask': best_ask
             }
-            self.orderbook_history.append(snapshot)
+            self.record_snapshot(snapshot)
+            self._last_mid = mid_price
             
             # Check for trading opportunity
             await self.check_entry_conditions(snapshot)
             
-            # Display current state
+            # Display current state (throttled)
+            now = time.monotonic()
+            if now - self._last_log_ts < 0.25:
+                return
+            self._last_log_ts = now
             direction = "🟢 BULLISH" if imbalance_ratio > 1 else "🔴 BEARISH"
             # Show history building progress
-            history_status = f"[{len(self.orderbook_history)}/30]" if len(self.orderbook_history) < 30 else ""
+            history_status = f"[{self.history_count}/30]" if self.history_count < 30 else ""
             
             print(f"\r[{datetime.now().strftime('%H:%M:%S')}] "
                   f"Price: ${mid_price:.2f} | "
                   f"Imbalance: {imbalance_ratio:.2f}:1 {direction} | "
                   f"Spread: {spread_bps:.1f}bps | "
                   f"Volume: {self.get_recent_volume():.2f}x avg {history_status}", 
-                  end='', flush=True)
+                  end='', flush=True)  # \r line has no newline to trigger a flush
                   
         except Exception as e:
             print(f"\n❌ Error analyzing orderbook: {e}")
@@ -331,41 +515,43 @@ class OrderBookHunter:
         for trade in trades:
             volume_usd = float(trade['sz']) * float(trade['px'])
             self.volume_history.append({
-                'time': time.time(),
+                'time': time.monotonic(),
                 'volume': volume_usd
             })
             
+    def record_snapshot(self, snapshot: dict):
+        """Append a book snapshot to the history ring buffers"""
+        head = self.history_head
+        self.history_time[head] = snapshot['time']
+        self.history_bid_size[head] = snapshot['bid_size']
+        self.history_ask_size[head] = snapshot['ask_size']
+        self.history_mid_price[head] = snapshot['mid_price']
+        self.history_head = (head + 1) % self.history_size
+        self.history_count = min(self.history_count + 1, self.history_size)
+        
     def get_recent_volume(self) -> float:
         """Get recent volume vs average using order book changes as proxy"""
-        if len(self.orderbook_history) < 10:
+        count = self.history_count
+        if _volume_ratio_kernel is not None:
+            return _volume_ratio_kernel(self.history_bid_size, self.history_ask_size,
+                                        self.history_mid_price, self.history_head, count)
+        
+        if count < 10:
             return 1.0
             
-        # Calculate volume proxy from order book size changes
-        volume_proxy = 0
-        for i in range(1, min(10, len(self.orderbook_history))):
-            curr = self.orderbook_history[-i]
-            prev = self.orderbook_history[-i-1]
-            
-            # Volume proxy = change in total book size + price movement
-            size_change = abs((curr['bid_size'] + curr['ask_size']) - 
-                            (prev['bid_size'] + prev['ask_size']))
-            price_change = abs(curr['mid_price'] - prev['mid_price'])
-            
-            # Combine size change and price volatility
-            volume_proxy += size_change + (price_change * 1000)  # Scale price change
-            
-        # Compare to longer-term average
-        if len(self.orderbook_history) >= 30:
-            avg_proxy = 0
-            for i in range(10, 30):
-                if i < len(self.orderbook_history) - 1:
-                    curr = self.orderbook_history[-i]
-                    prev = self.orderbook_history[-i-1]
-                    size_change = abs((curr['bid_size'] + curr['ask_size']) - 
-                                    (prev['bid_size'] + prev['ask_size']))
-                    price_change = abs(curr['mid_price'] - prev['mid_price'])
-                    avg_proxy += size_change + (price_change * 1000)
+        # Last (up to) 31 snapshots in chronological order
+        window = min(count, 31)
+        idx = (self.history_head - window + np.arange(window)) % self.history_size
+        total_size = self.history_bid_size[idx] + self.history_ask_size[idx]
+        mid_price = self.history_mid_price[idx]
+        
+        # Volume proxy per step = change in total book size + scaled price movement
+        proxy = np.abs(np.diff(total_size)) + np.abs(np.diff(mid_price)) * 1000
+        volume_proxy = proxy[-9:].sum()
             
+        # Compare to longer-term average (the 20 steps before the recent ones)
+        if count >= 30:
+            avg_proxy = proxy[-min(29, count - 2):-9].sum()
             avg_proxy = avg_proxy / 20 if avg_proxy > 0 else 1
             return (volume_proxy / 10) / avg_proxy if avg_proxy > 0 else 1.0
         
@@ -378,7 +564,9 @@ class OrderBookHunter:
             return
             
         # Get imbalance strength
-        imbalance = snapshot['imbalance_ratio']
+        imbalance = snapshot['imbalance']
+        if self.short_imbalance_threshold <= imbalance <= self.imbalance_threshold:
+            return  # Balanced book - skip the volume computation
         volume_spike = self.get_recent_volume()
         
         # Check for LONG opportunity
@@ -387,19 +575,19 @@ class OrderBookHunter:
             snapshot['spread_bps'] >= self.min_spread_bps):
             
             print(f"\n\n🚀 LONG SIGNAL DETECTED!")
-            print(f"   Imbalance: {imbalance:.2f}:1 (Bullish)")
+            print(f"   Imbalance: {snapshot['imbalance_ratio']:.2f}:1 ({imbalance:+.2f}, OIQ {snapshot['oiq']:+.2f}) (Bullish)")
             print(f"   Volume: {volume_spike:.1f}x average")
             print(f"   Entry: ${snapshot['best_ask']:.2f}")
             
             await self.enter_position('long', snapshot)
             
         # Check for SHORT opportunity (bearish when ask_size > bid_size, so ratio < 1)
-        elif (imbalance < 0.5 and  # More reasonable threshold for shorts
+        elif (imbalance < self.short_imbalance_threshold and  # More reasonable threshold for shorts
               volume_spike > self.volume_spike_threshold and
               snapshot['spread_bps'] >= self.min_spread_bps):
             
             print(f"\n\n🔴 SHORT SIGNAL DETECTED!")
-            print(f"   Imbalance: {imbalance:.2f}:1 (Bearish)")
+            print(f"   Imbalance: {snapshot['imbalance_ratio']:.2f}:1 ({imbalance:+.2f}, OIQ {snapshot['oiq']:+.2f}) (Bearish)")
             print(f"   Volume: {volume_spike:.1f}x average")
             print(f"   Entry: ${snapshot['best_bid']:.2f}")
             
@@ -417,20 +605,20 @@ class OrderBookHunter:
             # Get entry price
             if direction == 'long':
                 entry_price = snapshot['best_ask']
-                tp_price = round(entry_price * (1 + self.tp_percentage / 100), 2)
-                sl_price = round(entry_price * (1 - self.sl_percentage / 100), 2)
+                tp_price = round(entry_price * self._tp_long_mul, 2)
+                sl_price = round(entry_price * self._sl_long_mul, 2)
                 is_buy = True
             else:
                 entry_price = snapshot['best_bid']
-                tp_price = round(entry_price * (1 - self.tp_percentage / 100), 2)
-                sl_price = round(entry_price * (1 + self.sl_percentage / 100), 2)
+                tp_price = round(entry_price * self._tp_short_mul, 2)
+                sl_price = round(entry_price * self._sl_short_mul, 2)
                 is_buy = False
                 
             # Calculate position size in SOL
             position_size = round(position_usd / entry_price, 2)
             
             # Calculate actual capital required with leverage
-            capital_required = position_usd / self.leverage
+            capital_required = min(self._cap_base * size_multiplier, self._cap_max)
             
             print(f"\n📊 EXECUTING {direction.upper()} TRADE:")
             print(f"   Size: {position_size} SOL (${position_usd:.0f} position)")
@@ -440,49 +628,32 @@ class OrderBookHunter:
             print(f"   SL: ${sl_price:.2f} ({'-' if is_buy else '+'}{self.sl_percentage}%)")
             
             # Build grouped order with TP/SL like the working bot!
-            orders = [
-                # Main entry order
-                {
-                    "a": self.asset_index,
-                    "b": is_buy,
-                    "p": self.round_float(entry_price + (0.10 if is_buy else -0.10)),  # Slightly worse price to ensure fill
-                    "s": self.round_float(position_size),
-                    "r": False,  # Not reduce only
-                    "t": {"limit": {"tif": "Ioc"}}  # Immediate or cancel
-                },
-                # Stop Loss order
-                {
-                    "a": self.asset_index,
-                    "b": not is_buy,  # Opposite direction
-                    "p": self.round_float(sl_price + 1 if is_buy else sl_price - 1),  # Execution price beyond trigger
-                    "s": self.round_float(position_size),
-                    "r": True,  # Reduce only
-                    "t": {
-                        "trigger": {
-                            "isMarket": True,
-                            "triggerPx": self.round_float(sl_price),
-                            "tpsl": "sl"  # Stop Loss marker
-                        }
-                    }
-                },
-                # Take Profit order
-                {
-                    "a": self.asset_index,
-                    "b": not is_buy,  # Opposite direction
-                    "p": self.round_float(tp_price),
-                    "s": self.round_float(position_size),
-                    "r": True,  # Reduce only
-                    "t": {
-                        "trigger": {
-                            "isMarket": True,
-                            "triggerPx": self.round_float(tp_price),
-                            "tpsl": "tp"  # Take Profit marker
-                        }
-                    }
-                }
-            ]
+            size_str = self.round_float(position_size)
             
-            order_result = self.place_grouped_order(orders)
+            # Main entry order
+            entry = self._entry_tmpl.copy()
+            entry["b"] = is_buy
+            entry["p"] = self.round_float(entry_price + (0.10 if is_buy else -0.10))  # Slightly worse price to ensure fill
+            entry["s"] = size_str
+            
+            # Stop Loss order
+            sl = self._sl_tmpl.copy()
+            sl["b"] = not is_buy  # Opposite direction
+            sl["p"] = self.round_float(sl_price + 1 if is_buy else sl_price - 1)  # Execution price beyond trigger
+            sl["s"] = size_str
+            sl["t"] = {"trigger": {"isMarket": True, "triggerPx": self.round_float(sl_price), "tpsl": "sl"}}
+            
+            # Take Profit order
+            tp = self._tp_tmpl.copy()
+            tp["b"] = not is_buy  # Opposite direction
+            tp["p"] = self.round_float(tp_price)
+            tp["s"] = size_str
+            tp["t"] = {"trigger": {"isMarket": True, "triggerPx": tp["p"], "tpsl": "tp"}}
+            
+            orders = [entry, sl, tp]
+            
+            # Sign + POST in a worker thread; the WS reader keeps draining meanwhile
+            order_result = await asyncio.to_thread(self.place_grouped_order, orders)
             
             if order_result.get('status') == 'ok':
                 statuses = order_result.get('response', {}).get('data', {}).get('statuses', [])
@@ -501,7 +672,7 @@ class OrderBookHunter:
                             self.position_direction = direction
                         
                     self.position_open = True
-                    self.entry_time = time.time()
+                    self.entry_time = time.monotonic()
                     self.entry_price = entry_price
                     print("✅ Position opened with TP/SL grouped!")
                     if self.entry_order_data:
@@ -520,7 +691,7 @@ class OrderBookHunter:
             return
             
         # Check time stop
-        if time.time() - self.entry_time > self.time_stop_seconds:
+        if time.monotonic() - self.entry_time > self.time_stop_seconds:
             print(f"\n⏰ Time stop triggered! Closing position...")
             await self.close_position()
             
@@ -543,30 +714,8 @@ class OrderBookHunter:
             print(f"   Original Price: ${original_price:.2f}")
             print(f"   Direction: {self.position_direction}")
             
-            # First, cancel any existing TP/SL orders
-            cancel_action = {
-                "type": "cancel",
-                "cancels": [{"a": self.asset_index, "o": ""}]  # Cancel all orders for SOL
-            }
-            
-            nonce = int(time.time() * 1000)
-            signature = self.sign_action(cancel_action, None, nonce, True)
-            
-            cancel_payload = {
-                "action": cancel_action,
-                "nonce": nonce,
-                "signature": signature,
-                "vaultAddress": None
-            }
-            
-            requests.post(
-                "https://api.hyperliquid.xyz/exchange",
-                headers={"Content-Type": "application/json"},
-                json=cancel_payload
-            )
-            
-            # Get current price for market close
-            current_price = self.get_current_price()
+            # Get current price for market close (streamed book mid, REST as fallback)
+            current_price = self._last_mid or self.get_current_price()
             if not current_price:
                 print("❌ Could not get current price")
                 return
@@ -584,19 +733,26 @@ class OrderBookHunter:
             print(f"   Close Price: ${close_price:.2f}")
             print(f"   Close Size: {original_size}")
             
-            # Place the close order
-            close_order = {
-                "a": self.asset_index,
-                "b": is_buy,
-                "p": self.round_float(close_price),
-                "s": self.round_float(original_size),
-                "r": True,  # Reduce only
-                "t": {"limit": {"tif": "Ioc"}}  # Immediate or cancel
-            }
+            # Cancel the TP/SL orders and send the close at the same time
+            close_order = self._close_tmpl.copy()
+            close_order["b"] = is_buy
+            close_order["p"] = self.round_float(close_price)
+            close_order["s"] = self.round_float(original_size)
             
-            result = self.place_order_raw(close_order)
+            cancel_result, result = await asyncio.gather(
+                asyncio.to_thread(self.cancel_all_raw),
+                asyncio.to_thread(self.place_order_raw, close_order),
+                return_exceptions=True,  # One failing must not hide the other's outcome
+            )
             
-            if result.get('status') == 'ok':
+            if isinstance(cancel_result, BaseException):
+                print(f"❌ Error cancelling TP/SL orders: {cancel_result}")
+            elif cancel_result.get('status') != 'ok':
+                print(f"❌ Failed to cancel TP/SL orders: {cancel_result}")
+            
+            if isinstance(result, BaseException):
+                print(f"❌ Error closing position: {result}")
+            elif result.get('status') == 'ok':
                 print("✅ Position closed successfully!")
             else:
                 print(f"❌ Failed to close position: {result}")
@@ -616,7 +772,7 @@ class OrderBookHunter:
     async def run(self):
         """Main bot loop"""
         print("\n🎯 STARTING ORDER BOOK IMBALANCE HUNTER!")
-        print(f"📊 Strategy: {self.imbalance_threshold}:1 imbalance + "
+        print(f"📊 Strategy: {self.imbalance_threshold:+.2f} normalized imbalance + "
               f"{self.volume_spike_threshold}x volume spike")
         print(f"💰 Position: ${self.base_position_usd}-${self.max_position_usd} "
               f"(only ${self.base_capital_required}-${self.max_capital_required} of YOUR money!)")
@@ -624,35 +780,30 @@ class OrderBookHunter:
         print(f"🎯 TP: {self.tp_percentage}% | SL: {self.sl_percentage}%")
         print("=" * 60)
         
-        # For now, use REST API polling (WebSocket implementation above for future)
+        # Stream the L2 book over WebSocket, reconnecting with backoff
+        reconnect_delay = 1.0
         while True:
+            connected_at = time.monotonic()
             try:
-                # Get L2 book
-                l2_data = self.info.l2_snapshot(self.coin)
-                
-                # Convert to expected format
-                orderbook_data = {
-                    'levels': [
-                        [[str(level['px']), str(level['sz'])] for level in l2_data['levels'][0]],
-                        [[str(level['px']), str(level['sz'])] for level in l2_data['levels'][1]]
-                    ]
-                }
-                
-                # Analyze
-                await self.analyze_orderbook(orderbook_data)
-                
-                # Small delay to not overwhelm API
-                await asyncio.sleep(1.0)  # Increased to 1 second for stability
-                
+                await self.connect_websocket()
             except KeyboardInterrupt:
                 print("\n\n👋 Shutting down hunter...")
                 break
             except Exception as e:
                 # Only print error if it's not a common connection issue
                 if "Connection aborted" not in str(e):
-                    print(f"\n❌ Error in main loop: {e}")
-                await asyncio.sleep(2)  # Wait longer after errors
+                    print(f"\n❌ WebSocket error: {e}")
+            
+            # A connection that stayed up for a while resets the backoff
+            if time.monotonic() - connected_at > 30:
+                reconnect_delay = 1.0
+            print(f"\n🔌 WebSocket disconnected, reconnecting in {reconnect_delay:.0f}s...")
+            await asyncio.sleep(reconnect_delay)
+            reconnect_delay = min(reconnect_delay * 2, 30.0)
                 
 if __name__ == "__main__":
     hunter = OrderBookHunter()
-    asyncio.run(hunter.run())
\ No newline at end of file
+    if uvloop is not None:
+        uvloop.run(hunter.run())
+    else:
+        asyncio.run(hunter.run())
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""Offline checks for the scalping bot's HTTP client and cancel path"""
+
+import asyncio
+
+import httpx
+import pytest
+
+pytest.importorskip("hyperliquid")
+
+from ultimate_scalping_bot import UltimateScalpingBot
+
+
+def make_bot() -> UltimateScalpingBot:
+    """Bot without __init__ (no credentials, WebSocket or metadata fetch)"""
+    return UltimateScalpingBot.__new__(UltimateScalpingBot)
+
+
+def test_http_client_pool_limits(monkeypatch):
+    async def no_warmup(self, url, **kwargs):
+        return None
+
+    monkeypatch.setattr(httpx.AsyncClient, "head", no_warmup)
+    bot = make_bot()
+
+    async def open_and_read_pool():
+        await bot.open_http_client()
+        try:
+            return bot.http._transport._pool
+        finally:
+            await bot.http.aclose()
+
+    pool = asyncio.run(open_and_read_pool())
+    assert pool._keepalive_expiry == 30
+    assert pool._max_connections == 20
+    assert pool._max_keepalive_connections == 10
+
+
+class FakeHttp:
+    """Records /exchange posts and answers like a successful cancel"""
+
+    def __init__(self):
+        self.bodies = []
+
+    async def post(self, url, content):
+        self.bodies.append(content)
+        return httpx.Response(200, json={"status": "ok", "response": {"type": "cancel", "data": {"statuses": ["success"]}}})
+
+
+def test_presigned_cancel_is_sent_once():
+    bot = make_bot()
+    bot.asset_index = 5
+    bot._last_nonce = 0
+    bot.sign_action = lambda action, vault, nonce, is_mainnet: {"r": "0x1", "s": "0x2", "v": 27}
+    bot.http = FakeHttp()
+
+    bot.presign_cancel(12345)
+    body = bot._presigned_cancel
+
+    assert asyncio.run(bot.fast_cancel()) is True
+    assert asyncio.run(bot.fast_cancel()) is False
+    assert bot.http.bodies == [body]
@@ -8,12 +8,14 @@
 """
 
 import os
-import json
+import asyncio
+import orjson
 import time
-import requests
+import threading
+import httpx
 import msgpack
 from decimal import Decimal
-from datetime import datetime
+from dotenv import dotenv_values
 from eth_account import Account
 from eth_utils.crypto import keccak
 from eth_account.messages import encode_typed_data
@@ -21,8 +23,23 @@ from eth_utils.conversions import to_hex
 from hyperliquid.info import Info
 from hyperliquid.utils import constants
 
+try:
+    from Crypto.Hash import keccak as _keccak
+except ImportError:
+    _keccak = None  # pycryptodome is optional; hash_action falls back to eth_utils
+
+
+def keccak256(data: bytes) -> bytes:
+    """Keccak-256 via pycryptodome when available, else eth_utils"""
+    if _keccak is not None:
+        return _keccak.new(digest_bits=256, data=data).digest()
+    return keccak(data)
+
 
 class UltimateScalpingBot:
+    # Lower-cased fragments of exchange errors worth retrying with a fresh nonce
+    _TRANSIENT_ERRORS = ("rate limit", "too many", "timeout", "timed out", "temporarily")
+    
     def __init__(self):
         print('🎯 ULTIMATE HYPERLIQUID SCALPING BOT')
         print('=' * 60)
@@ -34,31 +51,131 @@ class UltimateScalpingBot:
         # Load credentials
         self.load_credentials()
         
-        # Initialize info client
-        self.info = Info(constants.MAINNET_API_URL, skip_ws=True)
+        # Reused msgpack encoder for action hashing
+        self._packer = msgpack.Packer()
+        
+        # Direct pycryptodome Keccak must match eth_utils before we sign with it
+        if _keccak is not None:
+            probe = b"hyperliquid"
+            if _keccak.new(digest_bits=256, data=probe).digest() != keccak(probe):
+                raise RuntimeError("pycryptodome keccak does not match eth_utils keccak")
+        
+        self._last_nonce = 0  # Nonces must be strictly increasing per signer
+        
+        # HTTP/2 keep-alive client for /exchange posts (opened inside the event loop)
+        self.http = None
+        
+        # Static EIP-712 typed-data skeleton; sign_action only fills in the message
+        self._sig_template = {
+            "domain": {
+                "chainId": 1337,
+                "name": "Exchange",
+                "verifyingContract": "0x0000000000000000000000000000000000000000",
+                "version": "1",
+            },
+            "types": {
+                "Agent": [
+                    {"name": "source", "type": "string"},
+                    {"name": "connectionId", "type": "bytes32"},
+                ],
+                "EIP712Domain": [
+                    {"name": "name", "type": "string"},
+                    {"name": "version", "type": "string"},
+                    {"name": "chainId", "type": "uint256"},
+                    {"name": "verifyingContract", "type": "address"},
+                ],
+            },
+            "primaryType": "Agent",
+            "message": None,
+        }
+        
+        # The domain and Agent type never change: hash them once and sign the
+        # final EIP-712 digest directly (checked against the typed-data path)
+        self._domain_separator = keccak256(
+            keccak256(b"EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
+            + keccak256(b"Exchange")
+            + keccak256(b"1")
+            + (1337).to_bytes(32, "big")
+            + bytes(32)  # verifyingContract 0x000...0
+        )
+        self._agent_typehash = keccak256(b"Agent(string source,bytes32 connectionId)")
+        self._source_hash = {True: keccak256(b"a"), False: keccak256(b"b")}
+        probe = keccak256(b"hyperliquid")
+        if self.sign_agent_digest(probe, True) != self.sign_agent_typed(probe, True):
+            raise RuntimeError("cached EIP-712 digest does not match typed-data signing")
+        
+        # Initialize info client (with WebSocket for the live SOL mid)
+        self.info = Info(constants.MAINNET_API_URL, skip_ws=False)
+        self._latest_sol_price = None
+        self._mid_ts = 0.0  # time.monotonic() of the last allMids tick
+        self.max_mid_age = 5.0  # Seconds without a tick before polling REST instead
+        self._entry_target = None  # Armed entry in integer micro-dollars; the callback fires _entry_hit
+        self._entry_hit = threading.Event()
+        self._hit_price = None
+        self._last_ts_second = -1  # Log timestamp is re-formatted once per second
+        self._last_ts_str = ""
         
         # Strategy parameters
         self.coin = 'SOL'
-        self.asset_index = 5  # SOL
+        asset_meta = self.load_asset_meta()
+        self.asset_index, sz_decimals = asset_meta.get(self.coin, (5, 2))  # SOL fallback
         self.leverage = 20
         self.position_size_usd = 300.0  # $300 position
         self.tp_percentage = 0.31  # +0.31% take profit (scales with price!)
         self.sl_percentage = 0.125  # -0.125% stop loss (scales with price!)
         self.entry_offset = 0.05  # 5 cents below current price
+        self._px_decimals = 2  # SOL price precision
+        self._sz_decimals = sz_decimals  # From exchange metadata
+        
+        # Order skeletons (Gtc buy entry, reduce-only sell SL/TP). Key order
+        # matters - it is part of the msgpack bytes that get signed.
+        self._entry_tmpl = {"a": self.asset_index, "b": True, "p": None, "s": None, "r": False,
+                            "t": {"limit": {"tif": "Gtc"}}}
+        self._sl_tmpl = {"a": self.asset_index, "b": False, "p": None, "s": None, "r": True, "t": None}
+        self._tp_tmpl = {"a": self.asset_index, "b": False, "p": None, "s": None, "r": True, "t": None}
+        self.max_post_attempts = 5  # 429/network/transient retries, 2s..30s backoff
+        
+        # Cancel for the resting entry, signed ahead of time (see presign_cancel)
+        self._presigned_cancel = None
         
+        # Stream allMids instead of polling REST (the age clock starts at subscribe)
+        self._mid_ts = time.monotonic()
+        self.info.subscribe({"type": "allMids"}, self._on_mids)
+        
+    def load_asset_meta(self) -> dict:
+        """Map coin -> (asset index, szDecimals), cached on disk for an hour"""
+        cache_path = os.path.expanduser('~/.cache/hl_meta.json')
+        try:
+            if time.time() - os.path.getmtime(cache_path) < 3600:
+                with open(cache_path, 'rb') as f:
+                    return {name: tuple(v) for name, v in orjson.loads(f.read()).items()}
+        except (OSError, ValueError):
+            pass
+        
+        try:
+            meta = self.info.meta()
+        except Exception as e:
+            print(f'⚠️ Could not fetch asset metadata: {e}')
+            return {}
+        asset_meta = {u['name']: (i, u['szDecimals']) for i, u in enumerate(meta['universe'])}
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, 'wb') as f:
+                f.write(orjson.dumps(asset_meta))
+        except OSError:
+            pass
+        return asset_meta
+    
     def load_credentials(self):
-        """Load credentials from .env file"""
-        env_vars = {}
-        with open('.env', 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    env_vars[key] = value
+        """Load credentials and options from .env file"""
+        env_vars = dotenv_values('.env')
         
         private_key = env_vars.get('HYPERLIQUID_PRIVATE_KEY')
         self.wallet = Account.from_key(private_key)
         print(f'🔑 Wallet: {self.wallet.address}')
+        
+        # Ctrl+C before entry cancels the resting order (pre-signed, one POST)
+        self.cancel_unfilled_on_stop = (env_vars.get('CANCEL_UNFILLED_ON_STOP') or 'false').lower() == 'true'
     
     def round_float(self, x: float) -> str:
         """Round float to string with proper precision"""
@@ -70,9 +187,24 @@ class UltimateScalpingBot:
         normalized = Decimal(rounded).normalize()
         return f"{normalized:f}"
     
+    def next_nonce(self) -> int:
+        """Millisecond nonce, bumped if needed so two actions never share one"""
+        nonce = max(time.time_ns() // 1_000_000, self._last_nonce + 1)
+        self._last_nonce = nonce
+        return nonce
+    
+    def _fmt(self, x: float, decimals: int | None) -> str:
+        """Format to a known precision without the Decimal path (round_float if unknown)"""
+        if decimals is None:
+            return self.round_float(x)
+        s = f"{x:.{decimals}f}"
+        if '.' in s:
+            s = s.rstrip('0').rstrip('.')
+        return "0" if s == "-0" else s
+    
     def hash_action(self, action, vault, nonce) -> bytes:
         """Hash the action for signing"""
-        data = msgpack.packb(action)
+        data = bytearray(self._packer.pack(action))
         data += nonce.to_bytes(8, "big")
         
         if vault is None:
@@ -80,7 +212,7 @@ class UltimateScalpingBot:
         else:
             data += b"\x01"
             data += bytes.fromhex(vault.removeprefix("0x"))
-        return keccak(data)
+        return keccak256(bytes(data))
     
     def sign_inner(self, data: dict) -> dict:
         """Sign the typed data"""
@@ -92,36 +224,54 @@ class UltimateScalpingBot:
             "v": signed["v"],
         }
     
+    def sign_agent_typed(self, h: bytes, is_mainnet: bool) -> dict:
+        """Sign the Agent message through full EIP-712 typed-data encoding"""
+        msg = {"source": "a" if is_mainnet else "b", "connectionId": h}
+        data = self._sig_template.copy()
+        data["message"] = msg
+        return self.sign_inner(data)
+    
+    def sign_agent_digest(self, h: bytes, is_mainnet: bool) -> dict:
+        """Sign the Agent message from the cached domain separator and type hash"""
+        struct_hash = keccak256(self._agent_typehash + self._source_hash[is_mainnet] + h)
+        digest = keccak256(b"\x19\x01" + self._domain_separator + struct_hash)
+        signed = Account._sign_hash(digest, self.wallet.key)
+        return {
+            "r": to_hex(signed.r),
+            "s": to_hex(signed.s),
+            "v": signed.v,
+        }
+    
     def sign_action(self, action: dict, vault: str | None, nonce: int, is_mainnet: bool) -> dict:
         """Sign an action with proper EIP-712 format"""
         h = self.hash_action(action, vault, nonce)
-        msg = {"source": "a" if is_mainnet else "b", "connectionId": h}
-        data = {
-            "domain": {
-                "chainId": 1337,
-                "name": "Exchange",
-                "verifyingContract": "0x0000000000000000000000000000000000000000",
-                "version": "1",
-            },
-            "types": {
-                "Agent": [
-                    {"name": "source", "type": "string"},
-                    {"name": "connectionId", "type": "bytes32"},
-                ],
-                "EIP712Domain": [
-                    {"name": "name", "type": "string"},
-                    {"name": "version", "type": "string"},
-                    {"name": "chainId", "type": "uint256"},
-                    {"name": "verifyingContract", "type": "address"},
-                ],
-            },
-            "primaryType": "Agent",
-            "message": msg,
-        }
-        return self.sign_inner(data)
+        return self.sign_agent_digest(h, is_mainnet)
+    
+    def _on_mids(self, msg: dict):
+        """allMids WebSocket callback: stamp the tick and check the SOL mid"""
+        mid = msg.get('data', {}).get('mids', {}).get(self.coin)
+        if mid is not None:
+            self._mid_ts = time.monotonic()
+            self._update_price(float(mid))
+    
+    def _update_price(self, price: float):
+        """Cache the SOL mid and fire the armed entry trigger"""
+        self._latest_sol_price = price
+        target = self._entry_target
+        if target is not None and round(price * 1_000_000) <= target and not self._entry_hit.is_set():
+            self._hit_price = price
+            self._entry_hit.set()
+    
+    def timestamp(self) -> str:
+        """HH:MM:SS for log lines, formatted only when the second changes"""
+        second = int(time.time())
+        if second != self._last_ts_second:
+            self._last_ts_str = time.strftime("%H:%M:%S", time.localtime(second))
+            self._last_ts_second = second
+        return self._last_ts_str
     
     def get_current_price(self) -> float:
-        """Get current SOL price"""
+        """Get current SOL price (REST)"""
         all_mids = self.info.all_mids()
         return float(all_mids[self.coin])
     
@@ -131,7 +281,25 @@ class UltimateScalpingBot:
         # Round to 2 decimals and ensure minimum
         return max(0.01, round(raw_size, 2))
     
-    def place_grouped_order(self, entry_price: float, position_size: float, tp_price: float, sl_price: float):
+    async def open_http_client(self):
+        """Open the shared HTTP/2 client and warm up its TLS connection"""
+        # Connect-level retries only; the transport never re-sends a request that reached the server.
+        # Limits must go on the transport - the client ignores its own when given one.
+        self.http = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=2,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30),
+            ),
+            headers={"Content-Type": "application/json"},
+            timeout=10.0,
+        )
+        try:
+            await self.http.head(constants.MAINNET_API_URL)  # Open TLS before the order moment
+        except httpx.HTTPError:
+            pass
+    
+    async def place_grouped_order(self, entry_price: float, position_size: float, tp_price: float, sl_price: float):
         """Place grouped order with entry, TP, and SL"""
         
         print(f'\n🎯 BUILDING GROUPED ORDER:')
@@ -139,48 +307,29 @@ class UltimateScalpingBot:
         print(f'   Take Profit: ${tp_price:.2f} (+{self.tp_percentage}%)')
         print(f'   Stop Loss: ${sl_price:.2f} (-{self.sl_percentage}%)')
         
-        # Build the orders array with proper structure
-        orders = [
-            # Main entry order
-            {
-                "a": self.asset_index,
-                "b": True,  # Buy
-                "p": self.round_float(entry_price),
-                "s": self.round_float(position_size),
-                "r": False,  # Not reduce only
-                "t": {"limit": {"tif": "Gtc"}}
-            },
-            # Stop Loss order (trigger)
-            {
-                "a": self.asset_index,
-                "b": False,  # Sell
-                "p": self.round_float(sl_price - 1),  # Execution price below trigger
-                "s": self.round_float(position_size),
-                "r": True,  # Reduce only
-                "t": {
-                    "trigger": {
-                        "isMarket": True,
-                        "triggerPx": self.round_float(sl_price),
-                        "tpsl": "sl"  # Stop Loss marker
-                    }
-                }
-            },
-            # Take Profit order (trigger)
-            {
-                "a": self.asset_index,
-                "b": False,  # Sell
-                "p": self.round_float(tp_price),
-                "s": self.round_float(position_size),
-                "r": True,  # Reduce only
-                "t": {
-                    "trigger": {
-                        "isMarket": True,
-                        "triggerPx": self.round_float(tp_price),
-                        "tpsl": "tp"  # Take Profit marker
-                    }
-                }
-            }
-        ]
+        # Format each distinct price/size once
+        entry_s = self._fmt(entry_price, self._px_decimals)
+        size_s = self._fmt(position_size, self._sz_decimals)
+        sl_exec_s = self._fmt(sl_price - 1, self._px_decimals)
+        sl_trig_s = self._fmt(sl_price, self._px_decimals)
+        tp_s = self._fmt(tp_price, self._px_decimals)
+        
+        # Fill the prebuilt order skeletons; only prices/size (and triggers) vary
+        entry = self._entry_tmpl.copy()
+        entry["p"] = entry_s
+        entry["s"] = size_s
+        
+        sl = self._sl_tmpl.copy()
+        sl["p"] = sl_exec_s  # Execution price below trigger
+        sl["s"] = size_s
+        sl["t"] = {"trigger": {"isMarket": True, "triggerPx": sl_trig_s, "tpsl": "sl"}}
+        
+        tp = self._tp_tmpl.copy()
+        tp["p"] = tp_s
+        tp["s"] = size_s
+        tp["t"] = {"trigger": {"isMarket": True, "triggerPx": tp_s, "tpsl": "tp"}}
+        
+        orders = [entry, sl, tp]
         
         # Build the action with normalTpsl grouping
         action = {
@@ -189,67 +338,123 @@ class UltimateScalpingBot:
             "grouping": "normalTpsl"  # 🎯 THE MAGIC GROUPING!
         }
         
-        # Sign the action
-        nonce = int(time.time() * 1000)
         vault = None
         is_mainnet = True
         
         print(f'\n🚀 Signing grouped order with normalTpsl...')
-        signature = self.sign_action(action, vault, nonce, is_mainnet)
+        body = None
         
-        # Build the request payload
-        payload = {
-            "action": action,
-            "nonce": nonce,
-            "signature": signature,
-            "vaultAddress": vault
-        }
-        
-        # Send the request
-        headers = {"Content-Type": "application/json"}
-        
-        try:
-            print(f'📡 Sending to Hyperliquid API...')
-            response = requests.post(
-                "https://api.hyperliquid.xyz/exchange",
-                headers=headers,
-                json=payload
-            )
+        for attempt in range(1, self.max_post_attempts + 1):
+            # Back off only between attempts, never after the last one
+            if attempt > 1:
+                await asyncio.sleep(backoff)
             
-            if response.status_code == 200:
-                result = response.json()
-                
-                if result.get('status') == 'ok':
-                    statuses = result.get('response', {}).get('data', {}).get('statuses', [])
-                    print(f'\n✅ GROUPED ORDER PLACED SUCCESSFULLY!')
-                    print(f'📊 Statuses: {statuses}')
-                    
-                    # Extract order ID from first status (main order)
-                    if statuses and isinstance(statuses[0], dict) and 'resting' in statuses[0]:
-                        order_id = statuses[0]['resting']['oid']
-                        print(f'🎯 Main Order ID: {order_id}')
-                        return order_id
-                    
-                    return True
-                else:
-                    print(f'\n❌ API Error: {result}')
-                    return False
-            else:
+            # Sign on the first attempt and again after a rejected (transient) action;
+            # 429s and network errors resend the same body - its nonce was never used
+            if body is None:
+                nonce = self.next_nonce()
+                signature = self.sign_action(action, vault, nonce, is_mainnet)
+                payload = {
+                    "action": action,
+                    "nonce": nonce,
+                    "signature": signature,
+                    "vaultAddress": vault
+                }
+                body = orjson.dumps(payload)
+            
+            backoff = min(30, 2 ** attempt)
+            try:
+                print(f'📡 Sending to Hyperliquid API... (attempt {attempt}/{self.max_post_attempts})')
+                response = await self.http.post(
+                    "https://api.hyperliquid.xyz/exchange",
+                    content=body
+                )
+            except httpx.TransportError as e:
+                print(f'⚠️ Network error: {e} - retrying in {backoff}s')
+                continue
+            except Exception as e:
+                print(f'\n❌ ERROR placing grouped order: {e}')
+                return False
+            
+            if response.status_code == 429:
+                print(f'⚠️ Rate limited (429) - backing off {backoff}s')
+                continue
+            
+            if response.status_code != 200:
                 print(f'\n❌ HTTP Error {response.status_code}: {response.text}')
                 return False
+            
+            result = orjson.loads(response.content)
+            
+            if result.get('status') == 'ok':
+                statuses = result.get('response', {}).get('data', {}).get('statuses', [])
+                print(f'\n✅ GROUPED ORDER PLACED SUCCESSFULLY!')
+                print(f'📊 Statuses: {statuses}')
                 
+                # Extract order ID from first status (main order)
+                if statuses and isinstance(statuses[0], dict) and 'resting' in statuses[0]:
+                    order_id = statuses[0]['resting']['oid']
+                    print(f'🎯 Main Order ID: {order_id}')
+                    return order_id
+                
+                return True
+            
+            error = str(result.get('response', ''))
+            if any(marker in error.lower() for marker in self._TRANSIENT_ERRORS):
+                print(f'⚠️ Transient API error: {error} - re-signing and retrying in {backoff}s')
+                body = None
+                continue
+            
+            print(f'\n❌ API Error: {result}')
+            return False
+        
+        print(f'\n❌ Giving up after {self.max_post_attempts} attempts')
+        return False
+    
+    def presign_cancel(self, order_id: int):
+        """Sign a cancel for the resting entry now so fast_cancel only has to POST"""
+        action = {
+            "type": "cancel",
+            "cancels": [{"a": self.asset_index, "o": order_id}]
+        }
+        nonce = self.next_nonce()
+        signature = self.sign_action(action, None, nonce, True)
+        self._presigned_cancel = orjson.dumps({
+            "action": action,
+            "nonce": nonce,
+            "signature": signature,
+            "vaultAddress": None
+        })
+    
+    async def fast_cancel(self) -> bool:
+        """Send the pre-signed entry cancel (no hashing or signing on this path)"""
+        if self._presigned_cancel is None:
+            return False
+        body, self._presigned_cancel = self._presigned_cancel, None  # One-shot: nonce can't be reused
+        try:
+            response = await self.http.post("https://api.hyperliquid.xyz/exchange", content=body)
+            result = orjson.loads(response.content) if response.status_code == 200 else None
         except Exception as e:
-            print(f'\n❌ ERROR placing grouped order: {e}')
+            print(f'❌ ERROR sending cancel: {e}')
             return False
+        
+        if result and result.get('status') == 'ok':
+            print(f'🛑 Entry order cancelled: {result.get("response", {}).get("data", {}).get("statuses", [])}')
+            return True
+        print(f'❌ Cancel failed: {result if result else response.status_code}')
+        return False
     
-    def execute_scalping_strategy(self):
+    async def execute_scalping_strategy(self):
         """Execute the complete scalping strategy with price monitoring"""
         
         print(f'\n🚀 STARTING ULTIMATE SCALPING STRATEGY!')
         print(f'💡 Monitoring price for instant TP/SL placement!')
         
-        # Get current price and calculate strategy prices
-        current_price = self.get_current_price()
+        # Warm the order connection while fetching the current price, then calculate strategy prices
+        _, current_price = await asyncio.gather(
+            self.open_http_client(),
+            asyncio.to_thread(self.get_current_price),
+        )
         entry_price = round(current_price - self.entry_offset, 2)
         position_size = self.calculate_position_size(entry_price)
         
@@ -266,46 +471,82 @@ class UltimateScalpingBot:
         print(f'   Stop Loss: ${sl_price:.2f} (-{self.sl_percentage}% = -${entry_price - sl_price:.2f})')
         
         # Place the grouped order
-        order_id = self.place_grouped_order(entry_price, position_size, tp_price, sl_price)
+        order_id = await self.place_grouped_order(entry_price, position_size, tp_price, sl_price)
         
         if not order_id:
             print(f'\n❌ Failed to place grouped order!')
             return
         
+        # A resting entry gets its cancel signed up front
+        if order_id is not True:
+            self.presign_cancel(order_id)
+        
         print(f'\n🎯 Starting price monitoring for entry at ${entry_price:.2f}...')
         print(f'💡 Will confirm when price touches entry!')
         
-        # Price monitoring loop
-        check_interval = 1  # Check every second
+        # Arm the entry trigger; the allMids callback fires it on the crossing tick
+        log_interval = 1.0  # Status line at most once per second after a move of at least 1 cent
+        heartbeat_interval = 10.0  # ...and at least this often, so a dead feed never looks like a flat market
+        last_printed_price = None
+        last_print_ts = 0.0
+        self._entry_target = round(entry_price * 1_000_000)  # Integer compare, exact to 6 decimals
+        if self._latest_sol_price is not None and self._latest_sol_price <= entry_price:
+            self._hit_price = self._latest_sol_price
+            self._entry_hit.set()
         
-        while True:
-            try:
-                current_price = self.get_current_price()
-                price_diff = current_price - entry_price
-                
-                timestamp = datetime.now().strftime("%H:%M:%S")
-                
-                if current_price <= entry_price:
-                    print(f'[{timestamp}] 🚀 PRICE HIT ENTRY! ${current_price:.2f} <= ${entry_price:.2f}')
-                    print(f'✅ Order should be filling NOW!')
-                    print(f'🎯 TP/SL orders are ALREADY PLACED and GROUPED!')
-                    print(f'💡 Check your Hyperliquid UI - TP/SL should be visible!')
-                    break
-                else:
-                    print(f'[{timestamp}] 💡 Price: ${current_price:.2f} (${price_diff:+.2f} from entry)')
+        feed_stale = False
+        try:
+            while not await asyncio.to_thread(self._entry_hit.wait, log_interval):
+                timestamp = self.timestamp()
                 
-                time.sleep(check_interval)
+                # The SDK's allMids socket does not reconnect: poll REST while it is silent
+                mid_age = time.monotonic() - self._mid_ts
+                if mid_age > self.max_mid_age:
+                    if not feed_stale:
+                        print(f'[{timestamp}] ⚠️ No allMids tick for {mid_age:.0f}s - polling REST')
+                        feed_stale = True
+                    try:
+                        self._update_price(await asyncio.to_thread(self.get_current_price))
+                    except Exception as e:
+                        print(f'[{timestamp}] ❌ Error getting price: {e}')
+                elif feed_stale:
+                    print(f'[{timestamp}] ✅ allMids feed is live again')
+                    feed_stale = False
                 
-            except KeyboardInterrupt:
-                print(f'\n⚠️ Monitoring stopped by user')
-                break
-            except Exception as e:
-                print(f'\n⚠️ Error in price monitoring: {e}')
-                time.sleep(check_interval)
+                current_price = self._latest_sol_price
+                if current_price is None:
+                    print(f'[{timestamp}] ⏳ Waiting for the first allMids tick...')
+                elif (last_printed_price is None or abs(current_price - last_printed_price) >= 0.01
+                        or time.monotonic() - last_print_ts >= heartbeat_interval):
+                    print(f'[{timestamp}] 💡 Price: ${current_price:.2f} (${current_price - entry_price:+.2f} from entry)'
+                          f' | last tick {mid_age:.1f}s ago')
+                    last_printed_price = current_price
+                    last_print_ts = time.monotonic()
+            
+            timestamp = self.timestamp()
+            print(f'[{timestamp}] 🚀 PRICE HIT ENTRY! ${self._hit_price:.2f} <= ${entry_price:.2f}')
+            print(f'✅ Order should be filling NOW!')
+            print(f'🎯 TP/SL orders are ALREADY PLACED and GROUPED!')
+            print(f'💡 Check your Hyperliquid UI - TP/SL should be visible!')
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            print(f'\n⚠️ Monitoring stopped by user')
+            if self.cancel_unfilled_on_stop:
+                await self.fast_cancel()
+            raise  # Interrupted: no completion banner
+        finally:
+            self._entry_target = None
         
         print(f'\n🎊 STRATEGY COMPLETE!')
         print(f'✅ Entry order placed with GROUPED TP/SL!')
         print(f'🎯 Everything should be visible in your Hyperliquid UI!')
+    
+    async def run(self):
+        """Run the strategy and close the HTTP client afterwards"""
+        try:
+            await self.execute_scalping_strategy()
+        finally:
+            if self.http is not None:
+                await self.http.aclose()
 
 
 def main():
@@ -320,7 +561,12 @@ def main():
     
     # Create and run the bot
     bot = UltimateScalpingBot()
-    bot.execute_scalping_strategy()
+    try:
+        asyncio.run(bot.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bot.info.disconnect_websocket()
 
 
 if __name__ == '__main__':